@@ -1,18 +1,25 @@
 import os
 import asyncio
+import bisect
 import json
+import random
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from zoneinfo import ZoneInfo
+from typing import Dict, List, Optional, Tuple, Union
 import logging
 from dataclasses import dataclass
 
-import requests
+import httpx
+from aiolimiter import AsyncLimiter
+import numpy as np
+import orjson
 from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
-import schedule
 import threading
 import time
+from collections import OrderedDict
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +27,16 @@ logging.basicConfig(
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
+# httpx logs every request URL at INFO, and those URLs carry the API key
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+JAKARTA_TZ = ZoneInfo("Asia/Jakarta")
+EARTH_RADIUS_KM = 6371.0
+
+# Traffic severity thresholds (percentage increase from normal), upper bound inclusive:
+# normal up to 15%, moderate 15-30%, heavy 30-60%, severe above 60%
+_SEV_THRESH = (0.15, 0.30, 0.60)
+_SEV_LABELS = ("normal", "moderate", "heavy", "severe")
 
 @dataclass
 class TrafficData:
@@ -29,13 +46,85 @@ class TrafficData:
     timestamp: datetime
     severity: str
 
+class GoogleMapsError(Exception):
+    """Google Maps returned an error status (message never includes the keyed URL)"""
+
 class JakartaTrafficBot:
+    _SEVERITY_EMOJI = {
+        "normal": "🟢",
+        "moderate": "🟡",
+        "heavy": "🟠",
+        "severe": "🔴"
+    }
+    
+    _ROUTE_TEMPLATE = (
+        "\n🚗 **Route Information**\n\n"
+        "📍 **Destination:** {dest}\n"
+        "{emoji} **Traffic Status:** {sev}\n\n"
+        "⏱️ **Travel Time:**\n"
+        "• Current (with traffic): {duration_mins} minutes\n"
+        "• Normal conditions: {normal_mins} minutes\n\n"
+        "{status}\n"
+    )
+    
+    # Severity is stored as a small integer code in traffic_history
+    _SEVERITY_CODES = {label: code for code, label in enumerate(_SEV_LABELS)}
+    
     def __init__(self, telegram_token: str, google_maps_api_key: str):
         self.telegram_token = telegram_token
         self.google_maps_api_key = google_maps_api_key
+        
+        # Google Maps endpoints with the constant query fields baked in
+        self._directions_base = "https://maps.googleapis.com/maps/api/directions/json?" + urlencode({
+            "departure_time": "now",
+            "traffic_model": "best_guess",
+            "key": google_maps_api_key
+        })
+        self._geocode_base = "https://maps.googleapis.com/maps/api/geocode/json?" + urlencode({
+            "key": google_maps_api_key
+        })
         self.db_path = "traffic_data.db"
+        
+        # One shared connection, serialized by a lock so it is safe to use from any thread
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._db_lock = threading.Lock()
         self.init_database()
         
+        # Historical averages keyed by (location, days_back) -> (average, expires_at).
+        # A 30-day average barely moves between samples, so entries simply expire.
+        # Only major road locations are cached; user routes rarely repeat.
+        self._hist_cache: Dict[Tuple[str, int], Tuple[Optional[float], float]] = {}
+        self.hist_cache_ttl = 10 * 60
+        
+        # Geocoded destinations keyed by normalized address -> (location, expires_at),
+        # kept in LRU order and backed by the geocode_cache table so it survives restarts
+        self._geocode_cache: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self.geocode_cache_ttl = 24 * 60 * 60
+        self.geocode_cache_size = 1000
+        
+        # Shared HTTP/2 client, set up in post_init
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Collection interval (seconds) keyed by the worst severity seen in the last cycle
+        self.collection_intervals = {
+            "severe": 5 * 60,
+            "heavy": 10 * 60,
+            "moderate": 15 * 60,
+            "normal": 30 * 60
+        }
+        self.collection_jitter = 0.10
+        # No collection between midnight and 05:00 Jakarta time
+        self.quiet_hours_end = 5
+        
+        # Cap in-flight Google Maps requests and keep well under the 50 QPS quota
+        self._fetch_semaphore = asyncio.Semaphore(20)
+        self._rate_limiter = AsyncLimiter(40, 1.0)
+        
+        # Retry policy for transient Google Maps errors
+        self.max_retries = 3
+        self.retry_backoff = 0.3
+        self.retry_statuses = {429, 500, 502, 503, 504}
+        
         # Major Jakarta roads with coordinates
         self.major_roads = {
             "Jalan Sudirman": [
@@ -60,56 +149,156 @@ class JakartaTrafficBot:
             ]
         }
         
-        # Traffic severity thresholds (percentage increase from normal)
-        self.severity_thresholds = {
-            "normal": 0.15,      # Up to 15% increase
-            "moderate": 0.30,    # 15-30% increase
-            "heavy": 0.60,       # 30-60% increase
-            "severe": 1.0        # 60%+ increase
-        }
+        # Column-wise copies of major_roads for vectorized distance queries
+        self._road_names = np.array(list(self.major_roads))
+        self._origins = np.array(
+            [[p[0]["lat"], p[0]["lng"]] for p in self.major_roads.values()], dtype=np.float64
+        )
+        self._dests = np.array(
+            [[p[1]["lat"], p[1]["lng"]] for p in self.major_roads.values()], dtype=np.float64
+        )
+        # Shape (2, roads, 2): both endpoints of every road, in radians
+        self._ends_rad = np.radians(np.stack((self._origins, self._dests)))
+        
+        # (name, origin, destination) with coordinates pre-formatted for the Directions API
+        self._roads = tuple(
+            (name, f"{p[0]['lat']},{p[0]['lng']}", f"{p[1]['lat']},{p[1]['lng']}")
+            for name, p in self.major_roads.items()
+        )
+        self._roads_by_name = {road[0]: road for road in self._roads}
+        # Stored location keys of the major roads; only these are worth caching averages for
+        self._road_locations = frozenset(f"{origin}-{destination}" for _, origin, destination in self._roads)
     
     def init_database(self):
         """Initialize SQLite database for storing traffic data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS traffic_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                location TEXT NOT NULL,
-                duration_in_traffic INTEGER NOT NULL,
-                duration_normal INTEGER NOT NULL,
-                timestamp DATETIME NOT NULL,
-                severity TEXT NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_subscriptions (
-                user_id INTEGER PRIMARY KEY,
-                locations TEXT NOT NULL,
-                alert_threshold TEXT DEFAULT 'heavy'
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self._db_lock:
+            cursor = self._db.cursor()
+            
+            # Connection-level tuning, applied once
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA cache_size=-20000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            
+            # Older databases stored severity as TEXT; move them aside for conversion
+            cursor.execute("PRAGMA table_info(traffic_history)")
+            columns = {row[1]: row[2] for row in cursor.fetchall()}
+            migrate_severity = columns.get("severity", "").upper() == "TEXT"
+            
+            cursor.execute("BEGIN IMMEDIATE")
+            if migrate_severity:
+                logger.info("Converting traffic_history.severity to integer codes...")
+                cursor.execute("DROP INDEX IF EXISTS idx_loc_ts")
+                cursor.execute("ALTER TABLE traffic_history RENAME TO traffic_history_text")
+            
+            # Create tables
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS traffic_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    location TEXT NOT NULL,
+                    duration_in_traffic INTEGER NOT NULL,
+                    duration_normal INTEGER NOT NULL,
+                    timestamp DATETIME NOT NULL,
+                    severity INTEGER NOT NULL CHECK(severity BETWEEN 0 AND 3)
+                )
+            ''')
+            
+            if migrate_severity:
+                cursor.execute('''
+                    INSERT INTO traffic_history 
+                    (id, location, duration_in_traffic, duration_normal, timestamp, severity)
+                    SELECT 
+                        id, location, duration_in_traffic, duration_normal, timestamp,
+                        CASE severity
+                            WHEN 'moderate' THEN 1
+                            WHEN 'heavy' THEN 2
+                            WHEN 'severe' THEN 3
+                            ELSE 0
+                        END
+                    FROM traffic_history_text
+                ''')
+                cursor.execute("DROP TABLE traffic_history_text")
+            cursor.execute("COMMIT")
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_loc_ts
+                ON traffic_history(location, timestamp)
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_subscriptions (
+                    user_id INTEGER PRIMARY KEY,
+                    locations TEXT NOT NULL,
+                    alert_threshold TEXT DEFAULT 'heavy'
+                )
+            ''')
+            
+            # Daily rollup of traffic_history so /stats reads a handful of rows
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS traffic_daily (
+                    day DATE PRIMARY KEY,
+                    n INTEGER NOT NULL,
+                    sum_dur INTEGER NOT NULL,
+                    severe_n INTEGER NOT NULL
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    address TEXT PRIMARY KEY,
+                    lat REAL NOT NULL,
+                    lng REAL NOT NULL,
+                    cached_at REAL NOT NULL
+                )
+            ''')
+            
+            # Backfill the rollup for databases created before it existed
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM traffic_daily)")
+            if not cursor.fetchone()[0]:
+                cursor.execute('''
+                    INSERT INTO traffic_daily (day, n, sum_dur, severe_n)
+                    SELECT 
+                        date(timestamp),
+                        COUNT(*),
+                        SUM(duration_in_traffic),
+                        COUNT(CASE WHEN severity = 3 THEN 1 END)
+                    FROM traffic_history
+                    GROUP BY date(timestamp)
+                ''')
+    
+    async def _get_json(self, client: httpx.AsyncClient, url: str) -> Dict:
+        """GET a fully built Google Maps URL, retrying transient errors with backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._rate_limiter, self._fetch_semaphore:
+                    response = await client.get(url)
+            except httpx.TransportError as e:
+                # Connect/read failures and dropped connections are retried like 5xx responses
+                if attempt == self.max_retries:
+                    raise
+                reason = type(e).__name__
+            else:
+                if response.status_code not in self.retry_statuses or attempt == self.max_retries:
+                    if response.is_error:
+                        # Not raise_for_status(): its message embeds the URL, API key included
+                        raise GoogleMapsError(
+                            f"{response.request.url.path} returned HTTP {response.status_code}"
+                        )
+                    return orjson.loads(response.content)
+                reason = f"status {response.status_code}"
+            
+            delay = self.retry_backoff * (2 ** attempt)
+            logger.warning(f"Google Maps request failed ({reason}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
     
-    def get_traffic_data(self, origin: Dict, destination: Dict) -> Optional[TrafficData]:
-        """Get traffic data from Google Maps API"""
+    async def get_traffic_data(self, client: httpx.AsyncClient, origin: str, destination: str) -> Optional[TrafficData]:
+        """Get traffic data from Google Maps API for "lat,lng" origin and destination strings"""
         try:
-            url = "https://maps.googleapis.com/maps/api/directions/json"
-            params = {
-                "origin": f"{origin['lat']},{origin['lng']}",
-                "destination": f"{destination['lat']},{destination['lng']}",
-                "departure_time": "now",
-                "traffic_model": "best_guess",
-                "key": self.google_maps_api_key
-            }
+            # origin/destination are already URL-safe "lat,lng" strings
+            url = f"{self._directions_base}&origin={origin}&destination={destination}"
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = await self._get_json(client, url)
             
             if data["status"] == "OK" and data["routes"]:
                 route = data["routes"][0]["legs"][0]
@@ -121,7 +310,7 @@ class JakartaTrafficBot:
                 severity = self.calculate_severity(increase_ratio)
                 
                 return TrafficData(
-                    location=f"{origin['lat']},{origin['lng']}-{destination['lat']},{destination['lng']}",
+                    location=f"{origin}-{destination}",
                     duration_in_traffic=duration_in_traffic,
                     duration_normal=duration_normal,
                     timestamp=datetime.now(),
@@ -133,57 +322,128 @@ class JakartaTrafficBot:
     
     def calculate_severity(self, increase_ratio: float) -> str:
         """Calculate traffic severity based on increase ratio"""
-        if increase_ratio <= self.severity_thresholds["normal"]:
-            return "normal"
-        elif increase_ratio <= self.severity_thresholds["moderate"]:
-            return "moderate"
-        elif increase_ratio <= self.severity_thresholds["heavy"]:
-            return "heavy"
-        else:
-            return "severe"
-    
-    def store_traffic_data(self, traffic_data: TrafficData):
-        """Store traffic data in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO traffic_history 
-            (location, duration_in_traffic, duration_normal, timestamp, severity)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            traffic_data.location,
-            traffic_data.duration_in_traffic,
-            traffic_data.duration_normal,
-            traffic_data.timestamp,
-            traffic_data.severity
-        ))
-        
-        conn.commit()
-        conn.close()
+        return _SEV_LABELS[bisect.bisect_left(_SEV_THRESH, increase_ratio)]
+    
+    def store_traffic_data(self, traffic_data: Union[TrafficData, List[TrafficData]]):
+        """Store one or more traffic samples in a single transaction"""
+        if isinstance(traffic_data, TrafficData):
+            traffic_data = [traffic_data]
+        
+        rows = [
+            (
+                td.location,
+                td.duration_in_traffic,
+                td.duration_normal,
+                td.timestamp,
+                self._SEVERITY_CODES[td.severity]
+            )
+            for td in traffic_data
+        ]
+        if not rows:
+            return
+        
+        with self._db_lock:
+            cursor = self._db.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.executemany('''
+                    INSERT INTO traffic_history 
+                    (location, duration_in_traffic, duration_normal, timestamp, severity)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+                cursor.executemany('''
+                    INSERT INTO traffic_daily (day, n, sum_dur, severe_n)
+                    VALUES (?, 1, ?, ?)
+                    ON CONFLICT(day) DO UPDATE SET
+                        n = n + 1,
+                        sum_dur = sum_dur + excluded.sum_dur,
+                        severe_n = severe_n + excluded.severe_n
+                ''', [
+                    (td.timestamp.date().isoformat(), td.duration_in_traffic, int(td.severity == "severe"))
+                    for td in traffic_data
+                ])
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
     
     def get_historical_average(self, location: str, days_back: int = 30) -> Optional[float]:
         """Get historical average traffic duration for a location"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return self.get_historical_averages([location], days_back).get(location)
+    
+    def get_historical_averages(self, locations: List[str], days_back: int = 30) -> Dict[str, Optional[float]]:
+        """Get historical average traffic durations for several locations in one query"""
+        now = time.monotonic()
+        averages = {}
+        missing = []
+        for location in locations:
+            cached = self._hist_cache.get((location, days_back))
+            if cached and now < cached[1]:
+                averages[location] = cached[0]
+            else:
+                missing.append(location)
+        
+        if not missing:
+            return averages
         
         cutoff_date = datetime.now() - timedelta(days=days_back)
+        placeholders = ", ".join("?" * len(missing))
+        
+        with self._db_lock:
+            cursor = self._db.cursor()
+            cursor.execute(f'''
+                SELECT location, AVG(duration_in_traffic) 
+                FROM traffic_history 
+                WHERE timestamp > ? AND location IN ({placeholders})
+                GROUP BY location
+            ''', (cutoff_date, *missing))
+            
+            results = dict(cursor.fetchall())
         
-        cursor.execute('''
-            SELECT AVG(duration_in_traffic) 
-            FROM traffic_history 
-            WHERE location = ? AND timestamp > ?
-        ''', (location, cutoff_date))
+        expires_at = now + self.hist_cache_ttl
+        for location in missing:
+            average = results.get(location) or None
+            if location in self._road_locations:
+                self._hist_cache[(location, days_back)] = (average, expires_at)
+            averages[location] = average
         
-        result = cursor.fetchone()
-        conn.close()
+        return averages
+    
+    def nearby_roads(self, user_lat: float, user_lng: float, k: int = 3) -> List[str]:
+        """Get the k major roads whose nearest endpoint is closest to a location"""
+        lat, lng = np.radians(user_lat), np.radians(user_lng)
+        ends = self._ends_rad
+        
+        # Haversine distance to both endpoints of every road in one pass
+        a = (
+            np.sin((ends[..., 0] - lat) / 2) ** 2
+            + np.cos(lat) * np.cos(ends[..., 0]) * np.sin((ends[..., 1] - lng) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)).min(axis=0)
         
-        return result[0] if result[0] else None
+        return self._road_names[np.argsort(distances)[:k]].tolist()
     
-    def is_traffic_unusual(self, current_duration: int, location: str) -> Tuple[bool, str]:
-        """Check if current traffic is unusually heavy compared to historical data"""
-        historical_avg = self.get_historical_average(location)
+    async def fetch_major_roads(self, road_names: Optional[List[str]] = None) -> List[Tuple[str, Optional[TrafficData]]]:
+        """Fetch traffic data for major roads concurrently (all of them by default)"""
+        if road_names is None:
+            roads = self._roads
+        else:
+            roads = tuple(self._roads_by_name[name] for name in road_names)
         
+        tasks = [self.get_traffic_data(self._client, origin, destination) for _, origin, destination in roads]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        road_data = []
+        for (road_name, _, _), result in zip(roads, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error getting traffic data for {road_name}: {result}")
+                result = None
+            road_data.append((road_name, result))
+        
+        return road_data
+    
+    def is_traffic_unusual(self, current_duration: int, historical_avg: Optional[float]) -> Tuple[bool, str]:
+        """Check if current traffic is unusually heavy compared to historical data"""
         if not historical_avg:
             return False, "No historical data available"
         
@@ -226,40 +486,46 @@ Use the buttons below or try these commands:
         """Handle /traffic command - show major roads traffic"""
         await update.message.reply_text("🔄 Checking traffic on major Jakarta roads...")
         
-        traffic_report = "🚦 **Jakarta Traffic Report**\n\n"
+        road_data = await self.fetch_major_roads()
+        traffic_report = await self.build_traffic_report("🚦 **Jakarta Traffic Report**\n\n", road_data)
         
-        for road_name, coordinates in self.major_roads.items():
-            traffic_data = self.get_traffic_data(coordinates[0], coordinates[1])
-            
+        await update.message.reply_text(traffic_report, parse_mode='Markdown')
+    
+    async def build_traffic_report(self, header: str, road_data: List[Tuple[str, Optional[TrafficData]]]) -> str:
+        """Store fetched road data and format it as a Markdown report"""
+        parts = [header]
+        
+        # Store data for historical analysis, off the event loop
+        await asyncio.to_thread(
+            self.store_traffic_data,
+            [traffic_data for _, traffic_data in road_data if traffic_data]
+        )
+        
+        historical_avgs = await asyncio.to_thread(
+            self.get_historical_averages,
+            [traffic_data.location for _, traffic_data in road_data if traffic_data]
+        )
+        
+        for road_name, traffic_data in road_data:
             if traffic_data:
-                # Store data for historical analysis
-                self.store_traffic_data(traffic_data)
-                
                 # Check if traffic is unusual
                 is_unusual, unusual_msg = self.is_traffic_unusual(
                     traffic_data.duration_in_traffic, 
-                    traffic_data.location
+                    historical_avgs.get(traffic_data.location)
                 )
                 
                 duration_mins = traffic_data.duration_in_traffic // 60
                 normal_mins = traffic_data.duration_normal // 60
                 
-                severity_emoji = {
-                    "normal": "🟢",
-                    "moderate": "🟡", 
-                    "heavy": "🟠",
-                    "severe": "🔴"
-                }
-                
-                traffic_report += f"{severity_emoji.get(traffic_data.severity, '⚪')} **{road_name}**\n"
-                traffic_report += f"Current: {duration_mins} min | Normal: {normal_mins} min\n"
+                parts.append(f"{self._SEVERITY_EMOJI.get(traffic_data.severity, '⚪')} **{road_name}**\n")
+                parts.append(f"Current: {duration_mins} min | Normal: {normal_mins} min\n")
                 
                 if is_unusual:
-                    traffic_report += f"⚠️ {unusual_msg}\n"
+                    parts.append(f"⚠️ {unusual_msg}\n")
                 
-                traffic_report += "\n"
+                parts.append("\n")
         
-        await update.message.reply_text(traffic_report, parse_mode='Markdown')
+        return "".join(parts)
     
     async def handle_location(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle shared location"""
@@ -273,6 +539,12 @@ Use the buttons below or try these commands:
             f"📍 Location received! ({location.latitude:.4f}, {location.longitude:.4f})\n\n"
             "Now send me your destination address or share another location as destination."
         )
+        
+        # Only query the roads around the user rather than every major road
+        road_data = await self.fetch_major_roads(self.nearby_roads(location.latitude, location.longitude))
+        if any(traffic_data for _, traffic_data in road_data):
+            traffic_report = await self.build_traffic_report("🚦 **Traffic Near You**\n\n", road_data)
+            await update.message.reply_text(traffic_report, parse_mode='Markdown')
     
     async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages (destinations)"""
@@ -293,41 +565,35 @@ Use the buttons below or try these commands:
         
         # Get route information
         origin = context.user_data['user_location']
-        traffic_data = self.get_traffic_data(origin, destination)
+        traffic_data = await self.get_traffic_data(
+            self._client,
+            f"{origin['lat']},{origin['lng']}",
+            f"{destination['lat']},{destination['lng']}"
+        )
         
         if traffic_data:
             duration_mins = traffic_data.duration_in_traffic // 60
             normal_mins = traffic_data.duration_normal // 60
             
+            historical_avg = await asyncio.to_thread(self.get_historical_average, traffic_data.location)
             is_unusual, unusual_msg = self.is_traffic_unusual(
                 traffic_data.duration_in_traffic,
-                traffic_data.location
+                historical_avg
             )
             
-            severity_emoji = {
-                "normal": "🟢",
-                "moderate": "🟡",
-                "heavy": "🟠", 
-                "severe": "🔴"
-            }
-            
-            response = f"""
-🚗 **Route Information**
-
-📍 **Destination:** {update.message.text}
-{severity_emoji.get(traffic_data.severity, '⚪')} **Traffic Status:** {traffic_data.severity.title()}
-
-⏱️ **Travel Time:**
-• Current (with traffic): {duration_mins} minutes
-• Normal conditions: {normal_mins} minutes
-
-{f"⚠️ {unusual_msg}" if is_unusual else "✅ Traffic is normal"}
-            """
+            response = self._ROUTE_TEMPLATE.format(
+                dest=update.message.text,
+                emoji=self._SEVERITY_EMOJI.get(traffic_data.severity, '⚪'),
+                sev=traffic_data.severity.title(),
+                duration_mins=duration_mins,
+                normal_mins=normal_mins,
+                status=f"⚠️ {unusual_msg}" if is_unusual else "✅ Traffic is normal"
+            )
             
             await update.message.reply_text(response, parse_mode='Markdown')
             
             # Store the data
-            self.store_traffic_data(traffic_data)
+            await asyncio.to_thread(self.store_traffic_data, traffic_data)
         else:
             await update.message.reply_text(
                 "❌ Could not get traffic data for this route. Please try again."
@@ -335,42 +601,117 @@ Use the buttons below or try these commands:
     
     async def geocode_address(self, address: str) -> Optional[Dict]:
         """Geocode an address using Google Maps API"""
+        cache_key = " ".join(address.lower().split())
+        cached = await asyncio.to_thread(self._get_cached_geocode, cache_key)
+        if cached:
+            return cached
+        
         try:
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
-            params = {
-                "address": f"{address}, Jakarta, Indonesia",
-                "key": self.google_maps_api_key
-            }
+            # Free-text address, so it still needs encoding
+            url = f"{self._geocode_base}&" + urlencode({"address": f"{address}, Jakarta, Indonesia"})
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = await self._get_json(self._client, url)
             
             if data["status"] == "OK" and data["results"]:
                 location = data["results"][0]["geometry"]["location"]
-                return {"lat": location["lat"], "lng": location["lng"]}
+                result = {"lat": location["lat"], "lng": location["lng"]}
+                await asyncio.to_thread(self._cache_geocode, cache_key, result)
+                return result
                 
         except Exception as e:
             logger.error(f"Geocoding error: {e}")
             
         return None
     
+    def _get_cached_geocode(self, cache_key: str) -> Optional[Dict]:
+        """Look up a geocoded address in memory, falling back to the database"""
+        now = time.time()
+        
+        # The lock also guards the in-memory cache, since this runs in worker threads
+        with self._db_lock:
+            cached = self._geocode_cache.get(cache_key)
+            if cached:
+                if now < cached[1]:
+                    self._geocode_cache.move_to_end(cache_key)
+                    return cached[0]
+                del self._geocode_cache[cache_key]
+            
+            cursor = self._db.cursor()
+            cursor.execute('''
+                SELECT lat, lng, cached_at 
+                FROM geocode_cache 
+                WHERE address = ? AND cached_at > ?
+            ''', (cache_key, now - self.geocode_cache_ttl))
+            
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            location = {"lat": row[0], "lng": row[1]}
+            self._remember_geocode(cache_key, location, row[2] + self.geocode_cache_ttl)
+        
+        return location
+    
+    def _cache_geocode(self, cache_key: str, location: Dict):
+        """Remember a geocoded address in memory and in the database"""
+        now = time.time()
+        
+        with self._db_lock:
+            self._remember_geocode(cache_key, location, now + self.geocode_cache_ttl)
+            
+            # Write the new entry and drop expired ones in one transaction
+            cursor = self._db.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO geocode_cache (address, lat, lng, cached_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (cache_key, location["lat"], location["lng"], now))
+                cursor.execute(
+                    "DELETE FROM geocode_cache WHERE cached_at <= ?",
+                    (now - self.geocode_cache_ttl,)
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+    
+    def _remember_geocode(self, cache_key: str, location: Dict, expires_at: float):
+        """Insert into the in-memory geocode cache, evicting the least recently used entry when full"""
+        self._geocode_cache[cache_key] = (location, expires_at)
+        self._geocode_cache.move_to_end(cache_key)
+        while len(self._geocode_cache) > self.geocode_cache_size:
+            self._geocode_cache.popitem(last=False)
+    
+    def get_weekly_stats(self) -> Tuple[int, Optional[float], int]:
+        """Get record count, average duration and severe count for the last 7 days"""
+        cutoff_day = (datetime.now() - timedelta(days=7)).date().isoformat()
+        
+        with self._db_lock:
+            cursor = self._db.cursor()
+            
+            # Get statistics from the daily rollup
+            cursor.execute('''
+                SELECT n, sum_dur, severe_n
+                FROM traffic_daily 
+                WHERE day > ?
+            ''', (cutoff_day,))
+            
+            days = cursor.fetchall()
+        
+        total_records = sum(day[0] for day in days)
+        total_duration = sum(day[1] for day in days)
+        severe_count = sum(day[2] for day in days)
+        
+        return (
+            total_records,
+            total_duration / total_records if total_records else None,
+            severe_count
+        )
+    
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /stats command"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get statistics
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_records,
-                AVG(duration_in_traffic) as avg_duration,
-                COUNT(CASE WHEN severity = 'severe' THEN 1 END) as severe_count
-            FROM traffic_history 
-            WHERE timestamp > datetime('now', '-7 days')
-        ''')
-        
-        stats = cursor.fetchone()
-        conn.close()
+        stats = await asyncio.to_thread(self.get_weekly_stats)
         
         if stats[0] > 0:
             avg_mins = int(stats[1] / 60) if stats[1] else 0
@@ -390,33 +731,81 @@ Use the buttons below or try these commands:
         
         await update.message.reply_text(stats_message, parse_mode='Markdown')
     
-    def collect_traffic_data(self):
+    async def collect_traffic_data(self) -> List[TrafficData]:
         """Scheduled function to collect traffic data"""
         logger.info("Collecting traffic data for major roads...")
         
-        for road_name, coordinates in self.major_roads.items():
-            traffic_data = self.get_traffic_data(coordinates[0], coordinates[1])
-            if traffic_data:
-                self.store_traffic_data(traffic_data)
-                logger.info(f"Stored traffic data for {road_name}")
+        collected = [traffic_data for _, traffic_data in await self.fetch_major_roads() if traffic_data]
+        
+        # One transaction for the whole cycle
+        await asyncio.to_thread(self.store_traffic_data, collected)
+        logger.info(f"Stored traffic data for {len(collected)}/{len(self.major_roads)} roads")
+        
+        return collected
+    
+    def next_collection_interval(self, collected: List[TrafficData]) -> float:
+        """Pick the next collection delay from the worst severity seen, with jitter"""
+        interval = min(
+            (self.collection_intervals.get(td.severity, self.collection_intervals["normal"]) for td in collected),
+            default=self.collection_intervals["normal"]
+        )
+        # Jitter keeps multiple replicas from hitting the API in lockstep
+        return interval * random.uniform(1 - self.collection_jitter, 1 + self.collection_jitter)
     
-    def start_scheduler(self):
-        """Start the traffic data collection scheduler"""
-        schedule.every(15).minutes.do(self.collect_traffic_data)
+    async def collection_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job queue callback: collect traffic data, then schedule the next run"""
+        now = datetime.now(JAKARTA_TZ)
+        if now.hour < self.quiet_hours_end:
+            resume_at = now.replace(hour=self.quiet_hours_end, minute=0, second=0, microsecond=0)
+            logger.info(f"Quiet hours, pausing collection until {resume_at:%H:%M}")
+            context.job_queue.run_once(self.collection_job, when=resume_at, name="collect_traffic")
+            return
         
-        def run_scheduler():
-            while True:
-                schedule.run_pending()
-                time.sleep(60)
+        collected = []
+        try:
+            collected = await self.collect_traffic_data()
+        except Exception as e:
+            logger.error(f"Traffic data collection failed: {e}")
         
-        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        scheduler_thread.start()
+        context.job_queue.run_once(
+            self.collection_job,
+            when=self.next_collection_interval(collected),
+            name="collect_traffic"
+        )
+    
+    async def post_init(self, application: Application):
+        """Open the shared HTTP client and start the collector once the event loop is running"""
+        # HTTP/2 multiplexes concurrent calls to maps.googleapis.com over one kept-alive connection
+        self._client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+            timeout=10
+        )
+        
+        # The job queue runs on the event loop (APScheduler's AsyncIOScheduler), no polling thread
+        application.job_queue.run_once(self.collection_job, when=0, name="collect_traffic")
         logger.info("Traffic data collection scheduler started")
     
+    async def post_shutdown(self, application: Application):
+        """Close the shared HTTP client and database connection"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        
+        # Closing the last connection checkpoints the WAL and removes its files
+        with self._db_lock:
+            self._db.close()
+    
     def run(self):
         """Run the bot"""
         # Create application
-        application = Application.builder().token(self.telegram_token).build()
+        application = (
+            Application.builder()
+            .token(self.telegram_token)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
         
         # Add handlers
         application.add_handler(CommandHandler("start", self.start_command))
@@ -425,9 +814,6 @@ Use the buttons below or try these commands:
         application.add_handler(MessageHandler(filters.LOCATION, self.handle_location))
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text))
         
-        # Start scheduler
-        self.start_scheduler()
-        
         # Run the bot
         logger.info("Starting Jakarta Traffic Bot...")
         application.run_polling(allowed_updates=Update.ALL_TYPES)